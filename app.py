@@ -1,8 +1,20 @@
 import streamlit as st
+import gc
 import os
+import glob
 import shutil
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from requests.adapters import HTTPAdapter
 from create_database import generate_data_store
-from query_data_dss import query_financial_dss, query_rag
+from query_data_dss import query_financial_dss, query_rag, prepare_stock_context, reset_knowledge_base
+from financial_data import CACHE_TTL_SECONDS
 from document_loader import DocumentLoader
 
 # Page config
@@ -15,24 +27,121 @@ st.set_page_config(
 # Constants
 DATA_PATH = "data/docs"
 CHROMA_PATH = "chroma"
+OLLAMA_TAGS_URL = "http://localhost:11434/api/tags"
+
+# Minimum interval between redraws of the streamed analysis
+STREAM_REFRESH_SECONDS = 0.25
+
+
+class IndexBuilds:
+    """Knowledge-base builds shared by every session of this server process"""
+
+    def __init__(self):
+        # Single worker so builds never overlap on the chroma folder
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        # Held while submitting a build or clearing data, so neither races the other
+        self.lock = threading.Lock()
+        self.future = None
+
+    def is_running(self):
+        """Whether any session's build is queued or in progress"""
+        future = self.future
+        return future is not None and not future.done()
+
+    def submit(self, fn):
+        with self.lock:
+            self.future = self.executor.submit(fn)
+            return self.future
+
+
+@st.cache_resource
+def get_index_builds():
+    """Process-wide build state, so sessions see each other's in-flight builds"""
+    return IndexBuilds()
+
+
+def rebuild_knowledge_base():
+    """Rebuild the vector store, then drop stale handles and answers for every session"""
+    try:
+        generate_data_store()
+    finally:
+        reset_knowledge_base()
 
 
 def save_uploaded_file(uploaded_file):
     """Save uploaded file to data directory"""
-    if not os.path.exists(DATA_PATH):
-        os.makedirs(DATA_PATH)
+    # exist_ok: one mkdir call, and several uploads may be saved concurrently
+    data_dir = Path(DATA_PATH)
+    data_dir.mkdir(parents=True, exist_ok=True)
+
+    file_path = data_dir / uploaded_file.name
+    # Copy in 1 MiB chunks rather than materializing the whole upload at once
+    uploaded_file.seek(0)
+    with file_path.open("wb") as f:
+        shutil.copyfileobj(uploaded_file, f, length=1024 * 1024)
+    return str(file_path)
 
-    file_path = os.path.join(DATA_PATH, uploaded_file.name)
-    with open(file_path, "wb") as f:
-        f.write(uploaded_file.getbuffer())
-    return file_path
+
+@st.cache_data(ttl=2, show_spinner=False)
+def list_documents():
+    """List uploaded document names with a single directory scan"""
+    try:
+        with os.scandir(DATA_PATH) as entries:
+            return [entry.name for entry in entries]
+    except FileNotFoundError:
+        return []
+
+
+def get_stock_context(ticker, preferences):
+    """Reuse this session's stock summary and narrative while ticker, preferences and day are unchanged"""
+    summary_key = (ticker, tuple(sorted(preferences.items())), date.today().isoformat())
+
+    memo = st.session_state.get('stock_context_memo')
+    if memo is not None:
+        key, stored_at, stock_context = memo
+        if key == summary_key and time.monotonic() - stored_at < CACHE_TTL_SECONDS:
+            return stock_context
+
+    stock_context = prepare_stock_context(ticker, preferences)
+    if stock_context[0]:
+        st.session_state.stock_context_memo = (summary_key, time.monotonic(), stock_context)
+    return stock_context
+
+
+@st.fragment(run_every=2)
+def show_index_status():
+    """Poll the background knowledge-base builds and rerun the app once they finish"""
+    if get_index_builds().is_running():
+        st.info("⏳ Processing documents in the background...")
+        return
+
+    # This session's own build reports its result; another session's just re-enables the buttons
+    future = st.session_state.get('index_future')
+    if future is None:
+        st.rerun()
+
+    st.session_state.index_future = None
+    error = future.exception()
+    if error is None:
+        st.session_state.index_result = (True, "✅ Documents processed successfully!")
+    else:
+        st.session_state.index_result = (False, f"Error processing documents: {error}")
+    st.rerun()
 
 
+@st.cache_resource
+def get_ollama_session():
+    """Keep-alive session shared across reruns so status checks reuse one connection"""
+    session = requests.Session()
+    session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
+    return session
+
+
+@st.cache_data(ttl=10, show_spinner=False)
 def check_ollama_status():
-    """Check Ollama status and return status info"""
+    """Check Ollama status and return status info (cached briefly across reruns)"""
     try:
-        import requests
-        response = requests.get("http://localhost:11434/api/tags", timeout=2)
+        response = get_ollama_session().get(OLLAMA_TAGS_URL, timeout=2)
         if response.status_code == 200:
             models = response.json().get('models', [])
             return True, models
@@ -41,6 +150,67 @@ def check_ollama_status():
         return False, []
 
 
+@st.cache_resource
+def get_cleanup_lock():
+    """Process-wide lock so sweeps started by different reruns never overlap"""
+    return threading.Lock()
+
+
+def cleanup_stale_folders(lock):
+    """Remove folders renamed aside by earlier "Clear All Data" runs"""
+    # Another rerun's sweep is still running; anything it misses goes on the next rerun
+    if not lock.acquire(blocking=False):
+        return
+    try:
+        for old_folder in glob.glob("chroma_old_*") + glob.glob("data_old_*"):
+            try:
+                shutil.rmtree(old_folder, ignore_errors=True)
+            except:
+                pass
+    finally:
+        lock.release()
+
+
+def clear_all_data():
+    """Move the document and chroma folders aside and try to delete them; returns error messages"""
+    errors = []
+
+    # Strategy: RENAME folders instead of deleting (Windows allows this even with locked files)
+    # Then try to delete the renamed folders
+
+    timestamp = uuid.uuid4().hex[:8]
+
+    # Handle DATA_PATH
+    if os.path.exists(DATA_PATH):
+        try:
+            old_data = f"data_old_{timestamp}"
+            os.rename(DATA_PATH, old_data)
+            time.sleep(0.1)
+            # Try to delete the renamed folder
+            try:
+                shutil.rmtree(old_data, ignore_errors=True)
+            except:
+                pass  # Will be cleaned up next time
+        except Exception as e:
+            errors.append(f"Could not clear data folder: {e}")
+
+    # Handle CHROMA_PATH
+    if os.path.exists(CHROMA_PATH):
+        try:
+            old_chroma = f"chroma_old_{timestamp}"
+            os.rename(CHROMA_PATH, old_chroma)
+            time.sleep(0.1)
+            # Try to delete the renamed folder
+            try:
+                shutil.rmtree(old_chroma, ignore_errors=True)
+            except:
+                pass  # Will be cleaned up next time
+        except Exception as e:
+            errors.append(f"Could not clear chroma folder: {e}")
+
+    return errors
+
+
 def main():
     # Initialize session state
     if 'dss_mode' not in st.session_state:
@@ -50,58 +220,23 @@ def main():
     if 'clear_data_flag' not in st.session_state:
         st.session_state.clear_data_flag = False
 
-    # Clean up any old renamed folders from previous sessions
-    import glob
-    for old_folder in glob.glob("chroma_old_*") + glob.glob("data_old_*"):
-        try:
-            shutil.rmtree(old_folder, ignore_errors=True)
-        except:
-            pass
+    # Clean up any old renamed folders from previous sessions without blocking the first paint
+    threading.Thread(target=cleanup_stale_folders, args=(get_cleanup_lock(),), daemon=True).start()
 
     # Handle data clearing at the start of the script run
     if st.session_state.clear_data_flag:
         st.session_state.clear_data_flag = False
 
-        import time
-        import uuid
-
-        success = True
-        errors = []
-
-        # Strategy: RENAME folders instead of deleting (Windows allows this even with locked files)
-        # Then try to delete the renamed folders
+        index_builds = get_index_builds()
+        # Hold the build lock so no session starts indexing while the folders are moved away
+        with index_builds.lock:
+            if index_builds.is_running():
+                errors = ["Documents are still being processed; try again once that finishes"]
+            else:
+                errors = clear_all_data()
+        success = not errors
 
-        timestamp = uuid.uuid4().hex[:8]
-
-        # Handle DATA_PATH
-        if os.path.exists(DATA_PATH):
-            try:
-                old_data = f"data_old_{timestamp}"
-                os.rename(DATA_PATH, old_data)
-                time.sleep(0.1)
-                # Try to delete the renamed folder
-                try:
-                    shutil.rmtree(old_data, ignore_errors=True)
-                except:
-                    pass  # Will be cleaned up next time
-            except Exception as e:
-                errors.append(f"Could not clear data folder: {e}")
-                success = False
-
-        # Handle CHROMA_PATH
-        if os.path.exists(CHROMA_PATH):
-            try:
-                old_chroma = f"chroma_old_{timestamp}"
-                os.rename(CHROMA_PATH, old_chroma)
-                time.sleep(0.1)
-                # Try to delete the renamed folder
-                try:
-                    shutil.rmtree(old_chroma, ignore_errors=True)
-                except:
-                    pass  # Will be cleaned up next time
-            except Exception as e:
-                errors.append(f"Could not clear chroma folder: {e}")
-                success = False
+        list_documents.clear()
 
         if success:
             st.success("✅ All data cleared successfully!")
@@ -190,6 +325,9 @@ def main():
         # Document management (both modes)
         st.subheader("📁 Document Management")
 
+        # Any session's build blocks saving and clearing; the chroma folder is shared
+        indexing = get_index_builds().is_running()
+
         # File upload
         uploaded_files = st.file_uploader(
             "Upload documents" + (" (Rules/Policies)" if st.session_state.dss_mode else ""),
@@ -201,29 +339,35 @@ def main():
         if uploaded_files:
             st.success(f"Uploaded {len(uploaded_files)} file(s)")
 
-            if st.button("💾 Save & Process Documents"):
-                with st.spinner("Saving and processing documents..."):
-                    # Save uploaded files
-                    for uploaded_file in uploaded_files:
-                        save_uploaded_file(uploaded_file)
-
-                    # Generate database
-                    try:
-                        generate_data_store()
-                        st.success("✅ Documents processed successfully!")
-                        st.rerun()
-                    except Exception as e:
-                        st.error(f"Error processing documents: {e}")
+            if st.button("💾 Save & Process Documents", disabled=indexing):
+                with st.spinner("Saving documents..."):
+                    # Save uploaded files in parallel (disk writes release the GIL)
+                    with ThreadPoolExecutor(max_workers=min(8, len(uploaded_files))) as executor:
+                        list(executor.map(save_uploaded_file, uploaded_files))
+                    list_documents.clear()
+
+                # Generate database in the background so the UI stays responsive;
+                # release our handle first since the build replaces the chroma folder
+                reset_knowledge_base()
+                st.session_state.index_future = get_index_builds().submit(rebuild_knowledge_base)
+                st.rerun()
+
+        # Background processing status
+        if indexing or st.session_state.get('index_future') is not None:
+            show_index_status()
+        elif 'index_result' in st.session_state:
+            succeeded, message = st.session_state.pop('index_result')
+            if succeeded:
+                st.success(message)
+            else:
+                st.error(message)
 
         # Show existing files
         st.markdown("**Current Documents:**")
-        if os.path.exists(DATA_PATH):
-            files = os.listdir(DATA_PATH)
-            if files:
-                for file in files:
-                    st.text(f"• {file}")
-            else:
-                st.info("No documents uploaded yet")
+        files = list_documents()
+        if files:
+            for file in files:
+                st.text(f"• {file}")
         else:
             st.info("No documents uploaded yet")
 
@@ -248,13 +392,12 @@ def main():
             st.warning("⚠️ No knowledge base")
 
         # Clear data button
-        if st.button("🗑️ Clear All Data", type="secondary"):
+        if st.button("🗑️ Clear All Data", type="secondary", disabled=indexing):
             # Set flag and force rerun - this ensures all DB connections are closed
             st.session_state.clear_data_flag = True
 
             # Force close any ChromaDB connections before rerun
-            import sys
-            import gc
+            reset_knowledge_base()
 
             # Remove chromadb from loaded modules to force cleanup
             modules_to_remove = [key for key in sys.modules.keys() if 'chroma' in key.lower()]
@@ -305,13 +448,30 @@ def main():
                         'risk_behavior': risk_behavior
                     }
 
-                    # Run DSS query
+                    # Show the analysis while the model is still writing it; chunks are
+                    # buffered and the placeholder redrawn at most every STREAM_REFRESH_SECONDS
+                    live_response = st.empty()
+                    streamed = []
+                    last_render = [0.0]
+
+                    def show_token(token):
+                        streamed.append(token)
+                        now = time.monotonic()
+                        if now - last_render[0] >= STREAM_REFRESH_SECONDS:
+                            last_render[0] = now
+                            live_response.markdown("".join(streamed))
+
+                    # Run DSS query; the stock context is loaded lazily, so a semantic-cache
+                    # hit never fetches and a repeat stock/profile reuses the session memo
                     response, sources, stock_summary = query_financial_dss(
                         query_text=query,
                         ticker=ticker,
                         preferences=preferences,
-                        use_rules=use_rules
+                        use_rules=use_rules,
+                        stock_context=lambda: get_stock_context(ticker, preferences),
+                        on_token=show_token
                     )
+                    live_response.empty()
 
                     # Display results
                     st.subheader("📊 Analysis Results")
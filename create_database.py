@@ -4,6 +4,7 @@ from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.vectorstores import Chroma
 from document_loader import DocumentLoader
 from dotenv import load_dotenv
+import functools
 import os
 import shutil
 
@@ -29,9 +30,15 @@ def generate_data_store():
     save_to_chroma(chunks)
 
 
+@functools.lru_cache(maxsize=None)
+def get_document_loader(data_path: str = DATA_PATH) -> DocumentLoader:
+    """Return a shared DocumentLoader per data path, reused across reruns"""
+    return DocumentLoader(data_path)
+
+
 def load_documents():
     """Load documents using the DocumentLoader class"""
-    loader = DocumentLoader(DATA_PATH)
+    loader = get_document_loader(DATA_PATH)
     documents = loader.load_documents()
     return documents
 
@@ -1,20 +1,106 @@
 import yfinance as yf
 import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
-from typing import Dict, Optional, Tuple
+import functools
+import json
+import threading
+import time
+from datetime import date, timedelta
+from typing import Callable, Dict, Optional, Tuple
+
+# How long fetched market data stays fresh in the provider cache
+CACHE_TTL_SECONDS = 900
+
+# Company profile fields (sector, dividend, ...) change rarely; refresh daily
+PROFILE_TTL_SECONDS = 86400
+
+# yf.download keeps its results in module-global state (shared._DFS), so
+# concurrent calls from different sessions would overwrite each other
+_download_lock = threading.Lock()
+
+# Upper bound on cached entries so a long-running process scanning many tickers
+# doesn't grow the provider cache without limit
+CACHE_MAX_ENTRIES = 512
+
+# Volatility framing keyed by (risk_tolerance, volatility bucket)
+_VOLATILITY_CONTEXT = {
+    ("Low", "low"): "This low volatility suggests stable price behavior suitable for conservative portfolios",
+    ("Low", "moderate"): "This moderate volatility indicates notable price fluctuations that may exceed conservative risk thresholds",
+    ("Low", "high"): "This high volatility represents substantial price swings and significant downside risk",
+    ("Medium", "low"): "This low volatility provides predictable behavior with limited downside",
+    ("Medium", "moderate"): "This moderate volatility is typical for diversified portfolios seeking balanced growth",
+    ("Medium", "high"): "This high volatility exceeds typical balanced portfolio thresholds",
+    ("High", "low"): "This low volatility limits potential for outsized returns but provides stability",
+    ("High", "moderate"): "This moderate volatility offers balanced opportunity for returns with manageable swings",
+    ("High", "high"): "This high volatility creates opportunities for significant returns during favorable market conditions",
+}
+
+# Narrative handed to the LLM; *_line / *_lines fields are optional and
+# include their own newline when present
+_NARRATIVE_TEMPLATE = """\
+=== STOCK PROFILE: {ticker} ===
+Analysis Period: {period} ending {fetch_date}
+
+BASIC INFORMATION:
+  Sector: {sector}
+  Industry: {industry}
+  Current Price: ${current_price}
+{dividend_line}
+RISK CHARACTERISTICS:
+  Annualized Volatility: {volatility_annual}% ({risk_classification} risk)
+  Context: {volatility_context}
+  Maximum Drawdown (period): {max_drawdown}%
+{beta_line}{recovery_line}  Sharp Moves (>5%): {sharp_moves_count} days
+
+HISTORICAL PERFORMANCE:
+{performance_lines}
+RECENT TRENDS:
+  3-Month Price Trend: {price_trend_3m}
+  Volume Trend: {volume_trend}
+  Position vs 50-Day Average: {position_vs_50day_avg}"""
 
 
 class FinancialDataProvider:
     """Fetches and summarizes stock data for DSS analysis"""
     
     def __init__(self):
+        # (kind, ticker, period) -> (expires_at, value)
         self.cache = {}
+        # The provider is shared by all app sessions; the loader runs unlocked
+        self._cache_lock = threading.Lock()
+    
+    def _get_cached(self, key: Tuple, loader: Callable, ttl: float = CACHE_TTL_SECONDS):
+        """Return the cached value for key, calling loader on a miss or once ttl has expired"""
+        with self._cache_lock:
+            entry = self.cache.get(key)
+        if entry is not None and time.monotonic() < entry[0]:
+            return entry[1]
+        
+        value = loader()
+        if value is not None:
+            with self._cache_lock:
+                self.cache.pop(key, None)
+                if len(self.cache) >= CACHE_MAX_ENTRIES:
+                    self._evict()
+                self.cache[key] = (time.monotonic() + ttl, value)
+        return value
+    
+    def _evict(self):
+        """Drop expired entries, or the one closest to expiring if none have (caller holds the lock)"""
+        now = time.monotonic()
+        expired = [key for key, (expires_at, _) in self.cache.items() if expires_at <= now]
+        for key in expired:
+            del self.cache[key]
+        if not expired:
+            del self.cache[min(self.cache, key=lambda k: self.cache[k][0])]
     
     def get_stock_summary(self, ticker: str, period: str = "1y") -> Optional[Dict]:
         """
         Fetch and compute comprehensive stock summary
         
+        Summaries are cached per (ticker, period) for CACHE_TTL_SECONDS so
+        repeated questions about the same stock skip the network entirely.
+        
         Args:
             ticker: Stock ticker symbol
             period: Time period (1mo, 3mo, 6mo, 1y, 2y)
@@ -22,31 +108,87 @@ class FinancialDataProvider:
         Returns:
             Dictionary with structured summary or None if fetch fails
         """
+        return self._get_cached(
+            ("summary", ticker.upper(), period),
+            lambda: self._fetch_stock_summary(ticker, period)
+        )
+    
+    def _download_history(self, ticker: str, period: str) -> Tuple[pd.DataFrame, pd.Series]:
+        """
+        Download the stock and the SPY benchmark in a single batched request
+        
+        The download is serialized process-wide: yf.download resets and fills
+        module-global result buffers, so two overlapping calls (e.g. from two
+        Streamlit sessions sharing the provider) would corrupt each other.
+        
+        Returns:
+            (stock OHLCV history, SPY close series)
+        """
+        symbols = list(dict.fromkeys([ticker.upper(), "SPY"]))
+        with _download_lock:
+            data = yf.download(
+                symbols,
+                period=period,
+                group_by='ticker',
+                auto_adjust=True,
+                threads=True,
+                progress=False
+            )
+        
+        hist = data[ticker.upper()].dropna(subset=['Close'])
+        spy_close = data["SPY"]['Close'].dropna()
+        return hist, spy_close
+    
+    def _get_company_profile(self, ticker: str) -> Dict:
+        """
+        Fetch the handful of Ticker.info fields the summary uses, cached for a day
+        
+        Ticker.info scrapes ~100 fields over HTTP and is the slowest call in a
+        summary, so it is kept out of the 15-minute price refresh.
+        """
+        def load():
+            info = yf.Ticker(ticker).info
+            return {
+                "sector": info.get("sector", "Unknown"),
+                "industry": info.get("industry", "Unknown"),
+                "dividend_yield": round(info.get("dividendYield", 0) * 100, 2) if info.get("dividendYield") else 0,
+                "market_cap": info.get("marketCap", "N/A")
+            }
+        
+        return self._get_cached(("profile", ticker.upper(), None), load, ttl=PROFILE_TTL_SECONDS)
+    
+    def _fetch_stock_summary(self, ticker: str, period: str) -> Optional[Dict]:
+        """Download stock data and compute the summary (uncached)"""
         try:
             # Fetch data from yfinance
-            stock = yf.Ticker(ticker)
-            hist = stock.history(period=period)
-            info = stock.info
+            hist, spy_close = self._download_history(ticker, period)
             
             if hist.empty:
                 return None
             
+            profile = self._get_company_profile(ticker)
+            
+            # Shared float64 views reused by every metric below
+            close = hist['Close'].to_numpy(dtype=np.float64)
+            rets = np.diff(close) / close[:-1]
+            spy_aligned = spy_close.reindex(hist.index).to_numpy(dtype=np.float64)
+            
             # Compute metrics
-            risk_metrics = self._compute_risk_metrics(hist)
-            performance_metrics = self._compute_performance(hist)
-            trend_analysis = self._analyze_trends(hist)
+            risk_metrics = self._compute_risk_metrics(rets, spy_aligned)
+            performance_metrics = self._compute_performance(close, spy_close.to_numpy(dtype=np.float64))
+            trend_analysis = self._analyze_trends(close, hist['Volume'].to_numpy(dtype=np.float64))
             
             # Build summary structure
             summary = {
                 "ticker": ticker.upper(),
                 "period": period,
-                "fetch_date": datetime.now().strftime("%Y-%m-%d"),
+                "fetch_date": _date_str(date.today().toordinal()),
                 "basic_info": {
-                    "sector": info.get("sector", "Unknown"),
-                    "industry": info.get("industry", "Unknown"),
-                    "current_price": round(hist['Close'].iloc[-1], 2),
-                    "dividend_yield": round(info.get("dividendYield", 0) * 100, 2) if info.get("dividendYield") else 0,
-                    "market_cap": info.get("marketCap", "N/A")
+                    "sector": profile["sector"],
+                    "industry": profile["industry"],
+                    "current_price": round(close[-1], 2),
+                    "dividend_yield": profile["dividend_yield"],
+                    "market_cap": profile["market_cap"]
                 },
                 "risk_metrics": risk_metrics,
                 "performance": performance_metrics,
@@ -59,50 +201,28 @@ class FinancialDataProvider:
             print(f"Error fetching data for {ticker}: {e}")
             return None
     
-    def _compute_risk_metrics(self, hist: pd.DataFrame) -> Dict:
-        """Compute volatility, drawdown, and risk indicators"""
-        returns = hist['Close'].pct_change().dropna()
-        
-        # Annualized volatility
-        volatility = returns.std() * np.sqrt(252) * 100
-        
-        # Maximum drawdown
-        cumulative = (1 + returns).cumprod()
-        running_max = cumulative.expanding().max()
-        drawdown = (cumulative - running_max) / running_max
-        max_drawdown = drawdown.min() * 100
+    def _compute_risk_metrics(self, rets: np.ndarray, spy_close: np.ndarray) -> Dict:
+        """
+        Compute volatility, drawdown, and risk indicators
         
-        # Beta (approximate using variance if SPY data available)
-        try:
-            spy = yf.Ticker("SPY").history(period="1y")['Close']
-            market_returns = spy.pct_change().dropna()
-            
-            # Align dates
-            aligned_returns = returns.reindex(market_returns.index).dropna()
-            aligned_market = market_returns.reindex(aligned_returns.index).dropna()
-            
-            covariance = np.cov(aligned_returns, aligned_market)[0][1]
-            market_variance = np.var(aligned_market)
-            beta = covariance / market_variance if market_variance > 0 else 1.0
-        except:
+        Args:
+            rets: Daily simple returns of the stock's close prices
+            spy_close: SPY close prices aligned to the stock's dates (NaN where missing)
+        """
+        volatility, max_drawdown, sharp_moves, avg_recovery_days = _risk_kernel(rets)
+        
+        # Beta over the days where both the stock and SPY have a return
+        market_rets = np.diff(spy_close) / spy_close[:-1]
+        both = np.isfinite(market_rets)
+        if np.count_nonzero(both) > 1:
+            # Demeaned dot products: cov / var without building a covariance matrix
+            r = rets[both] - rets[both].mean()
+            m = market_rets[both] - market_rets[both].mean()
+            market_variance = float(m @ m)
+            beta = float(r @ m) / market_variance if market_variance > 0 else 1.0
+        else:
             beta = None
         
-        # Drawdown recovery time
-        recovery_periods = []
-        in_drawdown = False
-        drawdown_start = None
-        
-        for i, val in enumerate(drawdown):
-            if val < -0.05 and not in_drawdown:  # Entered 5%+ drawdown
-                in_drawdown = True
-                drawdown_start = i
-            elif val >= -0.01 and in_drawdown:  # Recovered to within 1%
-                in_drawdown = False
-                if drawdown_start is not None:
-                    recovery_periods.append(i - drawdown_start)
-        
-        avg_recovery_days = int(np.mean(recovery_periods)) if recovery_periods else None
-        
         # Risk classification
         if volatility < 15:
             risk_class = "Low"
@@ -117,13 +237,11 @@ class FinancialDataProvider:
             "beta": round(beta, 2) if beta else None,
             "avg_recovery_days": avg_recovery_days,
             "risk_classification": risk_class,
-            "sharp_moves_count": len([r for r in returns if abs(r) > 0.05])  # Days with 5%+ moves
+            "sharp_moves_count": sharp_moves
         }
     
-    def _compute_performance(self, hist: pd.DataFrame) -> Dict:
-        """Compute return metrics"""
-        prices = hist['Close']
-        
+    def _compute_performance(self, close: np.ndarray, spy_close: np.ndarray) -> Dict:
+        """Compute return metrics from daily close prices"""
         # Various time periods
         periods = {
             "1_month": 21,
@@ -134,22 +252,18 @@ class FinancialDataProvider:
         
         returns = {}
         for name, days in periods.items():
-            if len(prices) >= days:
-                period_return = ((prices.iloc[-1] / prices.iloc[-days]) - 1) * 100
+            if len(close) >= days:
+                period_return = ((close[-1] / close[-days]) - 1) * 100
                 returns[name] = round(period_return, 2)
             else:
                 returns[name] = None
         
         # Compare to SPY (market benchmark)
-        try:
-            spy = yf.Ticker("SPY").history(period="1y")['Close']
-            if len(spy) >= 252 and len(prices) >= 252:
-                stock_annual = ((prices.iloc[-1] / prices.iloc[-252]) - 1) * 100
-                spy_annual = ((spy.iloc[-1] / spy.iloc[-252]) - 1) * 100
-                vs_market = round(stock_annual - spy_annual, 2)
-            else:
-                vs_market = None
-        except:
+        if len(spy_close) >= 252 and len(close) >= 252:
+            stock_annual = ((close[-1] / close[-252]) - 1) * 100
+            spy_annual = ((spy_close[-1] / spy_close[-252]) - 1) * 100
+            vs_market = round(stock_annual - spy_annual, 2)
+        else:
             vs_market = None
         
         return {
@@ -160,15 +274,12 @@ class FinancialDataProvider:
             "vs_sp500_1y": vs_market
         }
     
-    def _analyze_trends(self, hist: pd.DataFrame) -> Dict:
-        """Analyze price and volume trends"""
-        prices = hist['Close']
-        volume = hist['Volume']
-        
+    def _analyze_trends(self, close: np.ndarray, volume: np.ndarray) -> Dict:
+        """Analyze price and volume trends from daily close and volume arrays"""
         # Recent trend (last 3 months vs prior 3 months)
-        if len(prices) >= 126:
-            recent_avg = prices.iloc[-63:].mean()
-            prior_avg = prices.iloc[-126:-63].mean()
+        if len(close) >= 126:
+            recent_avg = close[-63:].mean()
+            prior_avg = close[-126:-63].mean()
             
             if recent_avg > prior_avg * 1.05:
                 price_trend = "rising"
@@ -181,8 +292,9 @@ class FinancialDataProvider:
         
         # Volume trend
         if len(volume) >= 63:
-            recent_vol = volume.iloc[-21:].mean()
-            prior_vol = volume.iloc[-63:-21].mean()
+            # nanmean: a missing volume print shouldn't void the whole window
+            recent_vol = np.nanmean(volume[-21:])
+            prior_vol = np.nanmean(volume[-63:-21])
             
             if recent_vol > prior_vol * 1.2:
                 volume_trend = "increasing"
@@ -194,9 +306,9 @@ class FinancialDataProvider:
             volume_trend = "insufficient_data"
         
         # Simple moving average position
-        if len(prices) >= 50:
-            sma_50 = prices.iloc[-50:].mean()
-            current = prices.iloc[-1]
+        if len(close) >= 50:
+            sma_50 = close[-50:].mean()
+            current = close[-1]
             
             if current > sma_50 * 1.02:
                 sma_position = "above"
@@ -227,93 +339,106 @@ class FinancialDataProvider:
         if not summary:
             return "Unable to fetch stock data."
         
-        # Build narrative sections
-        sections = []
-        
-        # Header
-        sections.append(f"=== STOCK PROFILE: {summary['ticker']} ===")
-        sections.append(f"Analysis Period: {summary['period']} ending {summary['fetch_date']}\n")
-        
-        # Basic Information
-        basic = summary['basic_info']
-        sections.append("BASIC INFORMATION:")
-        sections.append(f"  Sector: {basic['sector']}")
-        sections.append(f"  Industry: {basic['industry']}")
-        sections.append(f"  Current Price: ${basic['current_price']}")
-        if basic['dividend_yield'] > 0:
-            sections.append(f"  Dividend Yield: {basic['dividend_yield']}%")
-        sections.append("")
-        
-        # Risk Metrics (emphasis based on preferences)
-        risk = summary['risk_metrics']
-        sections.append("RISK CHARACTERISTICS:")
-        sections.append(f"  Annualized Volatility: {risk['volatility_annual']}% ({risk['risk_classification']} risk)")
-        
-        # Frame volatility based on risk tolerance
-        vol_context = self._get_volatility_context(
-            risk['volatility_annual'], 
+        # Narratives only depend on the summary values and risk tolerance, so
+        # memoize on a canonical JSON form of the summary
+        return _format_narrative(
+            json.dumps(summary, sort_keys=True),
             preferences.get('risk_tolerance', 'Medium')
         )
-        sections.append(f"  Context: {vol_context}")
-        
-        sections.append(f"  Maximum Drawdown (period): {risk['max_drawdown']}%")
-        
-        if risk['beta']:
-            sections.append(f"  Beta (market sensitivity): {risk['beta']}")
-        
-        if risk['avg_recovery_days']:
-            sections.append(f"  Average Recovery Time: {risk['avg_recovery_days']} days")
-        
-        sections.append(f"  Sharp Moves (>5%): {risk['sharp_moves_count']} days")
-        sections.append("")
-        
-        # Performance
-        perf = summary['performance']
-        sections.append("HISTORICAL PERFORMANCE:")
-        
-        if perf['return_1m'] is not None:
-            sections.append(f"  1-Month Return: {perf['return_1m']:+.2f}%")
-        if perf['return_3m'] is not None:
-            sections.append(f"  3-Month Return: {perf['return_3m']:+.2f}%")
-        if perf['return_1y'] is not None:
-            sections.append(f"  1-Year Return: {perf['return_1y']:+.2f}%")
-        
-        if perf['vs_sp500_1y'] is not None:
-            benchmark_text = "outperformed" if perf['vs_sp500_1y'] > 0 else "underperformed"
-            sections.append(f"  vs. S&P 500: {benchmark_text} by {abs(perf['vs_sp500_1y']):.2f}%")
-        sections.append("")
-        
-        # Trends
-        trends = summary['trends']
-        sections.append("RECENT TRENDS:")
-        sections.append(f"  3-Month Price Trend: {trends['price_trend_3m']}")
-        sections.append(f"  Volume Trend: {trends['volume_trend']}")
-        sections.append(f"  Position vs 50-Day Average: {trends['position_vs_50day_avg']}")
-        
-        return "\n".join(sections)
+
+
+def _risk_kernel(rets: np.ndarray) -> Tuple[float, float, int, Optional[int]]:
+    """
+    Numeric core of the risk metrics, operating only on a float64 returns array
     
-    def _get_volatility_context(self, volatility: float, risk_tolerance: str) -> str:
-        """Provide context for volatility based on risk tolerance"""
-        if risk_tolerance == "Low":
-            if volatility < 15:
-                return "This low volatility suggests stable price behavior suitable for conservative portfolios"
-            elif volatility < 25:
-                return "This moderate volatility indicates notable price fluctuations that may exceed conservative risk thresholds"
-            else:
-                return "This high volatility represents substantial price swings and significant downside risk"
-        
-        elif risk_tolerance == "High":
-            if volatility < 15:
-                return "This low volatility limits potential for outsized returns but provides stability"
-            elif volatility < 25:
-                return "This moderate volatility offers balanced opportunity for returns with manageable swings"
-            else:
-                return "This high volatility creates opportunities for significant returns during favorable market conditions"
-        
-        else:  # Medium
-            if volatility < 15:
-                return "This low volatility provides predictable behavior with limited downside"
-            elif volatility < 25:
-                return "This moderate volatility is typical for diversified portfolios seeking balanced growth"
-            else:
-                return "This high volatility exceeds typical balanced portfolio thresholds"
\ No newline at end of file
+    Returns:
+        (annualized volatility %, max drawdown %, days with 5%+ moves, average recovery days or None)
+    """
+    # Annualized volatility
+    volatility = rets.std(ddof=1) * np.sqrt(252) * 100
+    
+    # Maximum drawdown: distance of the compounded value below its running peak
+    cumulative = np.cumprod(1.0 + rets)
+    drawdown = cumulative / np.maximum.accumulate(cumulative) - 1.0
+    max_drawdown = drawdown.min() * 100
+    
+    sharp_moves = int(np.count_nonzero(np.abs(rets) > 0.05))
+    
+    # Drawdown recovery time: an episode starts on the first day in a 5%+
+    # drawdown and ends on the next day back within 1% of the peak
+    deep = np.flatnonzero(drawdown < -0.05)
+    recovered = np.flatnonzero(drawdown >= -0.01)
+    
+    # Deep days sharing the same count of prior recoveries belong to one episode
+    episode = np.searchsorted(recovered, deep)
+    starts = np.diff(episode, prepend=-1) != 0
+    deep, episode = deep[starts], episode[starts]
+    closed = episode < len(recovered)
+    recovery_periods = recovered[episode[closed]] - deep[closed]
+    
+    avg_recovery_days = int(np.mean(recovery_periods)) if recovery_periods.size else None
+    
+    return volatility, max_drawdown, sharp_moves, avg_recovery_days
+
+
+@functools.lru_cache(maxsize=64)
+def _format_narrative(summary_json: str, risk_tolerance: str) -> str:
+    """Build the LLM narrative for a JSON-serialized stock summary"""
+    summary = json.loads(summary_json)
+    basic = summary['basic_info']
+    risk = summary['risk_metrics']
+    perf = summary['performance']
+    trends = summary['trends']
+    
+    # Optional lines carry their own trailing newline so omitted ones leave no gap
+    performance_lines = "".join(
+        f"  {label} Return: {perf[key]:+.2f}%\n"
+        for label, key in (("1-Month", "return_1m"), ("3-Month", "return_3m"), ("1-Year", "return_1y"))
+        if perf[key] is not None
+    )
+    if perf['vs_sp500_1y'] is not None:
+        benchmark_text = "outperformed" if perf['vs_sp500_1y'] > 0 else "underperformed"
+        performance_lines += f"  vs. S&P 500: {benchmark_text} by {abs(perf['vs_sp500_1y']):.2f}%\n"
+    
+    return _NARRATIVE_TEMPLATE.format_map({
+        "ticker": summary['ticker'],
+        "period": summary['period'],
+        "fetch_date": summary['fetch_date'],
+        "sector": basic['sector'],
+        "industry": basic['industry'],
+        "current_price": basic['current_price'],
+        "dividend_line": f"  Dividend Yield: {basic['dividend_yield']}%\n" if basic['dividend_yield'] > 0 else "",
+        "volatility_annual": risk['volatility_annual'],
+        "risk_classification": risk['risk_classification'],
+        # Frame volatility based on risk tolerance
+        "volatility_context": _get_volatility_context(risk['volatility_annual'], risk_tolerance),
+        "max_drawdown": risk['max_drawdown'],
+        "beta_line": f"  Beta (market sensitivity): {risk['beta']}\n" if risk['beta'] else "",
+        "recovery_line": f"  Average Recovery Time: {risk['avg_recovery_days']} days\n" if risk['avg_recovery_days'] else "",
+        "sharp_moves_count": risk['sharp_moves_count'],
+        "performance_lines": performance_lines,
+        "price_trend_3m": trends['price_trend_3m'],
+        "volume_trend": trends['volume_trend'],
+        "position_vs_50day_avg": trends['position_vs_50day_avg']
+    })
+
+
+def _get_volatility_context(volatility: float, risk_tolerance: str) -> str:
+    """Provide context for volatility based on risk tolerance"""
+    if volatility < 15:
+        bucket = "low"
+    elif volatility < 25:
+        bucket = "moderate"
+    else:
+        bucket = "high"
+    
+    # Unknown tolerances fall back to the Medium framing
+    if risk_tolerance not in ("Low", "High"):
+        risk_tolerance = "Medium"
+    return _VOLATILITY_CONTEXT[(risk_tolerance, bucket)]
+
+
+@functools.lru_cache(maxsize=1)
+def _date_str(ordinal: int) -> str:
+    """Format a day ordinal as YYYY-MM-DD; memoized so strftime runs once per day"""
+    return date.fromordinal(ordinal).strftime("%Y-%m-%d")
\ No newline at end of file
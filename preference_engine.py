@@ -1,4 +1,193 @@
-from typing import Dict
+import functools
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Mapping, Sequence, Union
+
+import numpy as np
+
+
+def _freeze(table: Dict[str, Dict[str, str]]) -> Mapping[str, Mapping[str, str]]:
+    """Read-only view of a two-level frame table"""
+    return MappingProxyType({key: MappingProxyType(frame) for key, frame in table.items()})
+
+
+# Interpretation frameworks based on DSS principles; shared, immutable constants
+
+# Volatility interpretation varies by risk profile
+VOLATILITY_FRAMES = _freeze({
+    "Low": {
+        "emphasis": "downside protection and capital preservation",
+        "concern_language": "risk exposure, potential losses, drawdown severity",
+        "positive_language": "stability, predictability, preservation",
+        "threshold_view": "conservative risk bounds"
+    },
+    "Medium": {
+        "emphasis": "balanced growth with managed volatility",
+        "concern_language": "portfolio fluctuations, risk-adjusted returns",
+        "positive_language": "growth opportunities, reasonable stability",
+        "threshold_view": "moderate risk tolerance"
+    },
+    "High": {
+        "emphasis": "return potential and growth opportunities",
+        "concern_language": "opportunity cost, market dynamics",
+        "positive_language": "upside capture, aggressive growth, market opportunities",
+        "threshold_view": "elevated risk acceptance"
+    }
+})
+
+# Time horizon affects data focus
+TIME_FRAMES = _freeze({
+    "Short-term (<1yr)": {
+        "data_focus": "recent 3-6 month trends and near-term momentum",
+        "volatility_impact": "near-term price fluctuations and liquidity",
+        "recovery_concern": "short recovery windows are critical",
+        "relevant_metrics": "recent performance, current trends"
+    },
+    "Long-term (>1yr)": {
+        "data_focus": "multi-year patterns and fundamental stability",
+        "volatility_impact": "long-term trajectory smooths short-term noise",
+        "recovery_concern": "extended recovery periods are acceptable",
+        "relevant_metrics": "sustained trends, sector fundamentals"
+    }
+})
+
+# Risk behavior modulates interpretation tone
+BEHAVIOR_FRAMES = _freeze({
+    "Risk-averse": {
+        "perspective": "conservative with emphasis on protection",
+        "decision_frame": "what could go wrong and how to avoid losses",
+        "uncertainty_view": "threats to be mitigated",
+        "trade_off_priority": "safety over growth"
+    },
+    "Risk-seeking": {
+        "perspective": "opportunistic with emphasis on potential",
+        "decision_frame": "what upside exists and how to capture gains",
+        "uncertainty_view": "opportunities to be seized",
+        "trade_off_priority": "growth over safety"
+    }
+})
+
+# Metric interpretation buckets: values below the first edge map to bucket 0,
+# below the second edge to bucket 1, everything else (incl. NaN) to bucket 2
+VOL_BUCKETS = np.array([15.0, 25.0])
+DRAWDOWN_BUCKETS = np.array([10.0, 20.0])
+BETA_BUCKETS = np.array([0.8, 1.2])
+
+# Volatility wording keyed on (risk_tolerance, bucket)
+VOL_TEMPLATES = MappingProxyType({
+    ("Low", 0): "{v}% volatility indicates stable, predictable behavior aligned with conservative objectives",
+    ("Low", 1): "{v}% volatility suggests price swings that may exceed comfort thresholds for capital preservation",
+    ("Low", 2): "{v}% volatility represents substantial fluctuation risk unsuitable for conservative portfolios",
+    ("Medium", 0): "{v}% volatility indicates low-risk behavior suitable for core holdings",
+    ("Medium", 1): "{v}% volatility is typical for balanced growth strategies",
+    ("Medium", 2): "{v}% volatility exceeds typical balanced portfolio guidelines",
+    ("High", 0): "{v}% volatility suggests limited price movement, constraining potential for aggressive returns",
+    ("High", 1): "{v}% volatility provides meaningful opportunity for returns while remaining investable",
+    ("High", 2): "{v}% volatility creates significant return potential during favorable market phases"
+})
+
+# Drawdown wording keyed on (risk_behavior, bucket of |drawdown|)
+DRAWDOWN_TEMPLATES = MappingProxyType({
+    ("Risk-averse", 0): "{v:.1f}% maximum drawdown indicates limited downside exposure",
+    ("Risk-averse", 1): "{v:.1f}% maximum drawdown represents notable capital risk requiring consideration",
+    ("Risk-averse", 2): "{v:.1f}% maximum drawdown signals severe downside exposure posing preservation challenges",
+    ("Risk-seeking", 0): "{v:.1f}% maximum drawdown suggests constrained volatility limiting return potential",
+    ("Risk-seeking", 1): "{v:.1f}% maximum drawdown is typical for growth-oriented investments",
+    ("Risk-seeking", 2): "{v:.1f}% maximum drawdown indicates high volatility characteristic of aggressive positions"
+})
+
+# Beta wording keyed on (risk_behavior, bucket): below-market, market-like, above-market
+BETA_TEMPLATES = MappingProxyType({
+    ("Risk-averse", 0): "Beta of {v:.2f} indicates below-market volatility, providing defensive characteristics",
+    ("Risk-averse", 1): "Beta of {v:.2f} indicates market-like volatility, tracking market movements closely",
+    ("Risk-averse", 2): "Beta of {v:.2f} indicates above-market volatility, amplifying market downturns",
+    ("Risk-seeking", 0): "Beta of {v:.2f} indicates below-market volatility, limiting upside capture potential",
+    ("Risk-seeking", 1): "Beta of {v:.2f} indicates market-like volatility, participating in market gains proportionally",
+    ("Risk-seeking", 2): "Beta of {v:.2f} indicates above-market volatility, amplifying market upside"
+})
+
+
+def _template_rows(templates: Mapping, keys: Iterable[str]) -> Dict[str, np.ndarray]:
+    """Per-profile object arrays of the bucket templates, indexable with np.take"""
+    return {key: np.array([templates[(key, i)] for i in range(3)], dtype=object) for key in keys}
+
+
+_VOL_TEMPLATE_ROWS = _template_rows(VOL_TEMPLATES, ("Low", "Medium", "High"))
+_DRAWDOWN_TEMPLATE_ROWS = _template_rows(DRAWDOWN_TEMPLATES, ("Risk-averse", "Risk-seeking"))
+_BETA_TEMPLATE_ROWS = _template_rows(BETA_TEMPLATES, ("Risk-averse", "Risk-seeking"))
+
+# metric -> (bucket edges, template rows by profile, PreferenceEngine attribute
+# selecting the profile, profile used for unrecognized values, value transform)
+_METRIC_TABLES = MappingProxyType({
+    "volatility": (VOL_BUCKETS, _VOL_TEMPLATE_ROWS, "risk_tolerance", "Medium", None),
+    "drawdown": (DRAWDOWN_BUCKETS, _DRAWDOWN_TEMPLATE_ROWS, "risk_behavior", "Risk-seeking", np.abs),
+    "beta": (BETA_BUCKETS, _BETA_TEMPLATE_ROWS, "risk_behavior", "Risk-seeking", None)
+})
+
+
+def _bucket_indices(values: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """Bucket index per value: 0 below edges[0], 1 below edges[1], else 2 (NaN included)"""
+    return np.searchsorted(edges, values, side="right")
+
+
+# Preference guidance injected into the DSS prompt; filled with str.format_map
+_PROMPT_GUIDANCE_TEMPLATE = """
+PREFERENCE-DRIVEN ANALYSIS GUIDANCE:
+
+Risk Profile Context:
+- The user has {risk_tolerance} risk tolerance with {risk_behavior} behavior
+- Frame volatility and uncertainty in terms of: {volatility_emphasis}
+- When discussing risks, emphasize: {concern_language}
+- When discussing opportunities, emphasize: {positive_language}
+- Trade-off priority: {trade_off_priority}
+
+Time Horizon Context:
+- Investment horizon: {time_horizon}
+- Focus analysis on: {data_focus}
+- Interpret volatility as: {volatility_interpretation}
+- Recovery time perspective: {recovery_perspective}
+
+Analysis Perspective:
+- Adopt a {analysis_perspective} viewpoint
+- Frame decision considerations around: {decision_framing}
+
+CRITICAL: These preferences should shape HOW you interpret and present data,
+not just be restated. For example, the same 25% volatility should be framed
+as "significant downside risk" for risk-averse users but "opportunity for
+outsized returns" for risk-seeking users. The data is the same; the
+interpretation changes based on user context.
+"""
+
+
+def _build_interpretive_context(risk_tolerance: str, time_horizon: str, risk_behavior: str) -> Dict[str, str]:
+    """Resolve the preference frames into the flat interpretive context"""
+    vol_frame = VOLATILITY_FRAMES[risk_tolerance]
+    time_frame = TIME_FRAMES[time_horizon]
+    behavior_frame = BEHAVIOR_FRAMES[risk_behavior]
+    
+    return {
+        "volatility_emphasis": vol_frame["emphasis"],
+        "concern_language": vol_frame["concern_language"],
+        "positive_language": vol_frame["positive_language"],
+        "data_focus": time_frame["data_focus"],
+        "volatility_interpretation": time_frame["volatility_impact"],
+        "recovery_perspective": time_frame["recovery_concern"],
+        "analysis_perspective": behavior_frame["perspective"],
+        "decision_framing": behavior_frame["decision_frame"],
+        "trade_off_priority": behavior_frame["trade_off_priority"]
+    }
+
+
+@functools.lru_cache(maxsize=64)
+def _build_prompt_guidance(risk_tolerance: str, time_horizon: str, risk_behavior: str) -> str:
+    """Render the preference-driven guidance block, shared by engines with the same profile"""
+    context = _build_interpretive_context(risk_tolerance, time_horizon, risk_behavior)
+    
+    return _PROMPT_GUIDANCE_TEMPLATE.format_map({
+        **context,
+        "risk_tolerance": risk_tolerance.lower(),
+        "time_horizon": time_horizon.lower(),
+        "risk_behavior": risk_behavior.lower()
+    })
 
 
 class PreferenceEngine:
@@ -19,121 +208,24 @@ class PreferenceEngine:
         self.time_horizon = time_horizon
         self.risk_behavior = risk_behavior
         
-        # Preference matrices for interpretation
-        self._init_interpretation_contexts()
-    
-    def _init_interpretation_contexts(self):
-        """Initialize interpretation frameworks based on DSS principles"""
-        
-        # Volatility interpretation varies by risk profile
-        self.volatility_frames = {
-            "Low": {
-                "emphasis": "downside protection and capital preservation",
-                "concern_language": "risk exposure, potential losses, drawdown severity",
-                "positive_language": "stability, predictability, preservation",
-                "threshold_view": "conservative risk bounds"
-            },
-            "Medium": {
-                "emphasis": "balanced growth with managed volatility",
-                "concern_language": "portfolio fluctuations, risk-adjusted returns",
-                "positive_language": "growth opportunities, reasonable stability",
-                "threshold_view": "moderate risk tolerance"
-            },
-            "High": {
-                "emphasis": "return potential and growth opportunities",
-                "concern_language": "opportunity cost, market dynamics",
-                "positive_language": "upside capture, aggressive growth, market opportunities",
-                "threshold_view": "elevated risk acceptance"
-            }
-        }
-        
-        # Time horizon affects data focus
-        self.time_frames = {
-            "Short-term (<1yr)": {
-                "data_focus": "recent 3-6 month trends and near-term momentum",
-                "volatility_impact": "near-term price fluctuations and liquidity",
-                "recovery_concern": "short recovery windows are critical",
-                "relevant_metrics": "recent performance, current trends"
-            },
-            "Long-term (>1yr)": {
-                "data_focus": "multi-year patterns and fundamental stability",
-                "volatility_impact": "long-term trajectory smooths short-term noise",
-                "recovery_concern": "extended recovery periods are acceptable",
-                "relevant_metrics": "sustained trends, sector fundamentals"
-            }
-        }
-        
-        # Risk behavior modulates interpretation tone
-        self.behavior_frames = {
-            "Risk-averse": {
-                "perspective": "conservative with emphasis on protection",
-                "decision_frame": "what could go wrong and how to avoid losses",
-                "uncertainty_view": "threats to be mitigated",
-                "trade_off_priority": "safety over growth"
-            },
-            "Risk-seeking": {
-                "perspective": "opportunistic with emphasis on potential",
-                "decision_frame": "what upside exists and how to capture gains",
-                "uncertainty_view": "opportunities to be seized",
-                "trade_off_priority": "growth over safety"
-            }
-        }
+        # Preferences are fixed for the engine's lifetime, so resolve the derived
+        # context and prompt guidance once (guidance is shared per profile)
+        self._interpretive_context = _build_interpretive_context(risk_tolerance, time_horizon, risk_behavior)
+        self._prompt_guidance = _build_prompt_guidance(risk_tolerance, time_horizon, risk_behavior)
     
     def get_interpretive_context(self) -> Dict[str, str]:
         """
-        Generate interpretive context that will shape LLM reasoning.
+        Interpretive context that will shape LLM reasoning.
         Returns structured guidance for how to frame analysis.
         """
-        vol_frame = self.volatility_frames[self.risk_tolerance]
-        time_frame = self.time_frames[self.time_horizon]
-        behavior_frame = self.behavior_frames[self.risk_behavior]
-        
-        return {
-            "volatility_emphasis": vol_frame["emphasis"],
-            "concern_language": vol_frame["concern_language"],
-            "positive_language": vol_frame["positive_language"],
-            "data_focus": time_frame["data_focus"],
-            "volatility_interpretation": time_frame["volatility_impact"],
-            "recovery_perspective": time_frame["recovery_concern"],
-            "analysis_perspective": behavior_frame["perspective"],
-            "decision_framing": behavior_frame["decision_frame"],
-            "trade_off_priority": behavior_frame["trade_off_priority"]
-        }
+        return self._interpretive_context
     
     def get_prompt_guidance(self) -> str:
         """
-        Generate explicit prompt guidance for the LLM that operationalizes preferences.
+        Explicit prompt guidance for the LLM that operationalizes preferences.
         This is injected into the system prompt to actively shape reasoning.
         """
-        context = self.get_interpretive_context()
-        
-        guidance = f"""
-PREFERENCE-DRIVEN ANALYSIS GUIDANCE:
-
-Risk Profile Context:
-- The user has {self.risk_tolerance.lower()} risk tolerance with {self.risk_behavior.lower()} behavior
-- Frame volatility and uncertainty in terms of: {context['volatility_emphasis']}
-- When discussing risks, emphasize: {context['concern_language']}
-- When discussing opportunities, emphasize: {context['positive_language']}
-- Trade-off priority: {context['trade_off_priority']}
-
-Time Horizon Context:
-- Investment horizon: {self.time_horizon.lower()}
-- Focus analysis on: {context['data_focus']}
-- Interpret volatility as: {context['volatility_interpretation']}
-- Recovery time perspective: {context['recovery_perspective']}
-
-Analysis Perspective:
-- Adopt a {context['analysis_perspective']} viewpoint
-- Frame decision considerations around: {context['decision_framing']}
-
-CRITICAL: These preferences should shape HOW you interpret and present data,
-not just be restated. For example, the same 25% volatility should be framed
-as "significant downside risk" for risk-averse users but "opportunity for
-outsized returns" for risk-seeking users. The data is the same; the
-interpretation changes based on user context.
-"""
-        return guidance
+        return self._prompt_guidance
     
     def interpret_risk_metric(self, metric_name: str, value: float) -> str:
         """
@@ -155,76 +247,42 @@ interpretation changes based on user context.
         else:
             return f"{metric_name}: {value}"
     
-    def _interpret_volatility(self, vol: float) -> str:
-        """Interpret volatility based on risk preferences"""
-        vol_frame = self.volatility_frames[self.risk_tolerance]
+    def interpret_risk_metric_batch(self, metric_name: str, values: Union[Sequence[float], np.ndarray]) -> List[str]:
+        """
+        Interpret many values of one risk metric in a single pass
         
-        if self.risk_tolerance == "Low":
-            if vol < 15:
-                return f"{vol}% volatility indicates stable, predictable behavior aligned with conservative objectives"
-            elif vol < 25:
-                return f"{vol}% volatility suggests price swings that may exceed comfort thresholds for capital preservation"
-            else:
-                return f"{vol}% volatility represents substantial fluctuation risk unsuitable for conservative portfolios"
+        Args:
+            metric_name: e.g., "volatility", "drawdown", "beta"
+            values: numeric values of the metric (list or np.ndarray)
+            
+        Returns:
+            Interpreted descriptions, in the same order as values
+        """
+        table = _METRIC_TABLES.get(metric_name)
+        if table is None:
+            return [f"{metric_name}: {v}" for v in values]
         
-        elif self.risk_tolerance == "High":
-            if vol < 15:
-                return f"{vol}% volatility suggests limited price movement, constraining potential for aggressive returns"
-            elif vol < 25:
-                return f"{vol}% volatility provides meaningful opportunity for returns while remaining investable"
-            else:
-                return f"{vol}% volatility creates significant return potential during favorable market phases"
+        edges, rows_by_profile, profile_attr, default_profile, transform = table
+        numeric = np.asarray(values, dtype=float)
+        if transform is not None:
+            numeric = transform(numeric)
         
-        else:  # Medium
-            if vol < 15:
-                return f"{vol}% volatility indicates low-risk behavior suitable for core holdings"
-            elif vol < 25:
-                return f"{vol}% volatility is typical for balanced growth strategies"
-            else:
-                return f"{vol}% volatility exceeds typical balanced portfolio guidelines"
+        rows = rows_by_profile.get(getattr(self, profile_attr), rows_by_profile[default_profile])
+        templates = np.take(rows, _bucket_indices(numeric, edges))
+        # Format from the original values so ints keep their plain rendering
+        return [template.format(v=v) for template, v in zip(templates, values)]
+    
+    def _interpret_volatility(self, vol: float) -> str:
+        """Interpret volatility based on risk preferences"""
+        return self.interpret_risk_metric_batch("volatility", [vol])[0]
     
     def _interpret_drawdown(self, dd: float) -> str:
         """Interpret maximum drawdown"""
-        dd_abs = abs(dd)
-        
-        if self.risk_behavior == "Risk-averse":
-            if dd_abs < 10:
-                return f"{dd:.1f}% maximum drawdown indicates limited downside exposure"
-            elif dd_abs < 20:
-                return f"{dd:.1f}% maximum drawdown represents notable capital risk requiring consideration"
-            else:
-                return f"{dd:.1f}% maximum drawdown signals severe downside exposure posing preservation challenges"
-        else:  # Risk-seeking
-            if dd_abs < 10:
-                return f"{dd:.1f}% maximum drawdown suggests constrained volatility limiting return potential"
-            elif dd_abs < 20:
-                return f"{dd:.1f}% maximum drawdown is typical for growth-oriented investments"
-            else:
-                return f"{dd:.1f}% maximum drawdown indicates high volatility characteristic of aggressive positions"
+        return self.interpret_risk_metric_batch("drawdown", [dd])[0]
     
     def _interpret_beta(self, beta: float) -> str:
         """Interpret beta (market sensitivity)"""
-        if beta < 0.8:
-            sensitivity = "below-market volatility"
-        elif beta < 1.2:
-            sensitivity = "market-like volatility"
-        else:
-            sensitivity = "above-market volatility"
-        
-        if self.risk_behavior == "Risk-averse":
-            if beta < 0.8:
-                return f"Beta of {beta:.2f} indicates {sensitivity}, providing defensive characteristics"
-            elif beta < 1.2:
-                return f"Beta of {beta:.2f} indicates {sensitivity}, tracking market movements closely"
-            else:
-                return f"Beta of {beta:.2f} indicates {sensitivity}, amplifying market downturns"
-        else:
-            if beta < 0.8:
-                return f"Beta of {beta:.2f} indicates {sensitivity}, limiting upside capture potential"
-            elif beta < 1.2:
-                return f"Beta of {beta:.2f} indicates {sensitivity}, participating in market gains proportionally"
-            else:
-                return f"Beta of {beta:.2f} indicates {sensitivity}, amplifying market upside"
+        return self.interpret_risk_metric_batch("beta", [beta])[0]
     
     def get_preference_summary(self) -> str:
         """Return human-readable summary of preferences"""
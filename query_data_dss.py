@@ -5,9 +5,17 @@ from langchain_core.prompts import PromptTemplate
 from langchain.chains.retrieval_qa.base import RetrievalQA
 from langchain_community.llms import Ollama
 from dotenv import load_dotenv
+import functools
+import hashlib
+import json
 import os
+import sys
+import threading
+import time
+import numpy as np
 import requests
-from typing import Tuple, Optional, Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Tuple, Optional, Dict, List
 
 from financial_data import FinancialDataProvider
 from preference_engine import PreferenceEngine
@@ -16,12 +24,210 @@ from preference_engine import PreferenceEngine
 load_dotenv()
 
 CHROMA_PATH = "chroma"
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+# Semantic response cache: cosine similarity needed for a hit, total entries
+# kept before evicting the least-used one, and how long an answer stays valid
+SEMANTIC_CACHE_THRESHOLD = 0.85
+SEMANTIC_CACHE_MAX_ENTRIES = 1000
+SEMANTIC_CACHE_TTL_SECONDS = 24 * 60 * 60
+
+# First line of generate_structured_fallback output; such answers are never cached
+FALLBACK_HEADER = "DECISION SUPPORT ANALYSIS:"
+
+# Ollama availability probe: a healthy server is re-checked every 30s, an
+# unreachable one every 5s so it is picked up soon after it starts
+OLLAMA_TAGS_URL = "http://localhost:11434/api/tags"
+OLLAMA_UP_TTL_SECONDS = 30
+OLLAMA_DOWN_TTL_SECONDS = 5
+
+# Last probe as (monotonic_time, (running, models)) and the model chosen from it
+_ollama_status = None
+_OLLAMA_MODEL = None
+
+# Local model used when Ollama is unavailable
+HF_FALLBACK_MODEL = "microsoft/DialoGPT-medium"
+
+
+@functools.lru_cache(maxsize=1)
+def get_financial_provider() -> FinancialDataProvider:
+    """Return the process-wide provider so its market-data cache survives across queries and reruns"""
+    return FinancialDataProvider()
+
+
+# Lazily created, process-wide retrieval handles; guarded so concurrent first
+# queries don't load the embedding model twice
+_embeddings = None
+_chroma_db = None
+_retrieval_lock = threading.RLock()
+
+# Last chroma folder check as (monotonic_time, exists); None until first checked.
+# A found folder is trusted until reset_knowledge_base(), a missing one is
+# re-checked after CHROMA_MISSING_TTL_SECONDS so an external build is picked up
+_chroma_present = None
+CHROMA_MISSING_TTL_SECONDS = 60
+
+# Runs rule retrieval alongside the market-data fetch of a DSS query
+_rules_executor = ThreadPoolExecutor(max_workers=2)
+
+
+def _get_embeddings() -> HuggingFaceEmbeddings:
+    """Load the MiniLM sentence embedding model once per process"""
+    global _embeddings
+    if _embeddings is None:
+        with _retrieval_lock:
+            if _embeddings is None:
+                _embeddings = HuggingFaceEmbeddings(
+                    model_name=EMBEDDING_MODEL,
+                    model_kwargs={'device': 'cpu'}
+                )
+    return _embeddings
 
 
-def check_ollama_running():
-    """Check if Ollama is running and has models available"""
+def _get_chroma_db() -> Chroma:
+    """Open the persisted Chroma database once and reuse it across queries"""
+    global _chroma_db
+    if _chroma_db is None:
+        with _retrieval_lock:
+            if _chroma_db is None:
+                _chroma_db = Chroma(persist_directory=CHROMA_PATH, embedding_function=_get_embeddings())
+    return _chroma_db
+
+
+def _chroma_available() -> bool:
+    """Check for the persisted knowledge base without a stat on every query"""
+    global _chroma_present
+    now = time.monotonic()
+    if _chroma_present is not None:
+        checked_at, exists = _chroma_present
+        if exists or now - checked_at < CHROMA_MISSING_TTL_SECONDS:
+            return exists
+
+    exists = os.path.isdir(CHROMA_PATH)
+    _chroma_present = (now, exists)
+    return exists
+
+
+class _SemanticCache:
+    """
+    In-memory cache of DSS answers that also matches near-identical questions.
+
+    Entries are bucketed by a hash of (ticker, preferences, use_rules). Within a
+    bucket, a lookup returns the stored answer whose question embedding has the
+    highest cosine similarity to the new question, provided it reaches the
+    threshold. Expired entries are dropped lazily; when full, the least
+    frequently hit entry is evicted.
+    """
+
+    def __init__(self, threshold: float, max_entries: int, ttl: float):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._buckets = {}  # bucket -> list of {"embedding", "result", "created", "hits"}
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def bucket_key(ticker: str, preferences: Dict[str, str], use_rules: bool) -> str:
+        raw = json.dumps([ticker.upper(), sorted(preferences.items()), use_rules])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def lookup(self, bucket: str, embedding: np.ndarray) -> Optional[Tuple[str, List[str], Optional[Dict]]]:
+        with self._lock:
+            entries = self._live_entries(bucket)
+            if not entries:
+                return None
+
+            # Embeddings are L2-normalized, so the dot product is the cosine similarity
+            scores = np.vstack([entry["embedding"] for entry in entries]) @ embedding
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                return None
+
+            entries[best]["hits"] += 1
+            return entries[best]["result"]
+
+    def insert(self, bucket: str, embedding: np.ndarray, result: Tuple[str, List[str], Optional[Dict]]):
+        with self._lock:
+            self._live_entries(bucket)
+            if self._size >= self.max_entries:
+                self._evict_least_used()
+
+            self._buckets.setdefault(bucket, []).append({
+                "embedding": embedding,
+                "result": result,
+                "created": time.monotonic(),
+                "hits": 0
+            })
+            self._size += 1
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+            self._size = 0
+
+    def _live_entries(self, bucket: str) -> List[Dict]:
+        """Drop expired entries from a bucket and return what is left"""
+        entries = self._buckets.get(bucket, [])
+        now = time.monotonic()
+        live = [entry for entry in entries if now - entry["created"] < self.ttl]
+        self._size -= len(entries) - len(live)
+        if live:
+            self._buckets[bucket] = live
+        else:
+            self._buckets.pop(bucket, None)
+        return live
+
+    def _evict_least_used(self):
+        """Remove the entry with the fewest hits, oldest first on ties"""
+        _, _, bucket, index = min(
+            (entry["hits"], entry["created"], bucket, i)
+            for bucket, entries in self._buckets.items()
+            for i, entry in enumerate(entries)
+        )
+        del self._buckets[bucket][index]
+        if not self._buckets[bucket]:
+            del self._buckets[bucket]
+        self._size -= 1
+
+
+_semantic_cache = _SemanticCache(
+    threshold=SEMANTIC_CACHE_THRESHOLD,
+    max_entries=SEMANTIC_CACHE_MAX_ENTRIES,
+    ttl=SEMANTIC_CACHE_TTL_SECONDS
+)
+
+
+def reset_knowledge_base():
+    """
+    Drop the cached Chroma handle, its availability check and cached DSS answers.
+
+    Call after the knowledge base is rebuilt or cleared so the next query reopens
+    the database and no answer grounded in the old rules is served.
+    """
+    global _chroma_db, _chroma_present
+    with _retrieval_lock:
+        _chroma_db = None
+        _chroma_present = None
+    _semantic_cache.clear()
+
+
+def _embed_query(query_text: str) -> Optional[np.ndarray]:
+    """L2-normalized embedding of a question, or None if the model is unavailable"""
     try:
-        response = requests.get("http://localhost:11434/api/tags", timeout=2)
+        embedding = np.asarray(_get_embeddings().embed_query(query_text), dtype=np.float32)
+    except Exception as e:
+        print(f"Semantic cache unavailable: {e}")
+        return None
+
+    norm = np.linalg.norm(embedding)
+    return embedding / norm if norm > 0 else None
+
+
+def _probe_ollama() -> Tuple[bool, List[Dict]]:
+    """Ask the local Ollama server which models it has installed"""
+    try:
+        response = requests.get(OLLAMA_TAGS_URL, timeout=2)
         if response.status_code == 200:
             models = response.json().get('models', [])
             return len(models) > 0, models
@@ -30,11 +236,62 @@ def check_ollama_running():
         return False, []
 
 
+def check_ollama_running():
+    """Check if Ollama is running and has models available (probe result reused for a short while)"""
+    global _ollama_status, _OLLAMA_MODEL
+    now = time.monotonic()
+    if _ollama_status is not None:
+        checked_at, status = _ollama_status
+        ttl = OLLAMA_UP_TTL_SECONDS if status[0] else OLLAMA_DOWN_TTL_SECONDS
+        if now - checked_at < ttl:
+            return status
+
+    status = _probe_ollama()
+    ollama_running, models = status
+    if ollama_running:
+        _OLLAMA_MODEL = "llama3.2" if any("llama3.2" in m['name'] for m in models) else models[0]['name']
+    _ollama_status = (now, status)
+    return status
+
+
+@functools.lru_cache(maxsize=4)
+def _get_ollama(model_name: str, temperature: float) -> Ollama:
+    """Reuse one LangChain Ollama client per (model, temperature) instead of building one per query"""
+    return Ollama(model=model_name, temperature=temperature, top_p=0.9)
+
+
+@functools.lru_cache(maxsize=1)
+def _get_hf_pipeline():
+    """Load the local Hugging Face fallback model once per process (half precision on GPU)"""
+    import torch
+    from transformers import pipeline, AutoTokenizer, AutoModelForCausalLM
+
+    tokenizer = AutoTokenizer.from_pretrained(HF_FALLBACK_MODEL)
+    if torch.cuda.is_available():
+        model = AutoModelForCausalLM.from_pretrained(
+            HF_FALLBACK_MODEL,
+            torch_dtype=torch.float16,
+            device_map="auto"
+        )
+    else:
+        model = AutoModelForCausalLM.from_pretrained(HF_FALLBACK_MODEL)
+
+    return pipeline(
+        "text-generation",
+        model=model,
+        tokenizer=tokenizer,
+        pad_token_id=tokenizer.eos_token_id
+    )
+
+
 def query_financial_dss(
         query_text: str,
         ticker: str,
         preferences: Dict[str, str],
-        use_rules: bool = True
+        use_rules: bool = True,
+        stock_context: Optional[Callable[[], Tuple[Optional[Dict], str]]] = None,
+        on_token: Optional[Callable[[str], None]] = None,
+        rules: Optional[Tuple[str, List[str]]] = None
 ) -> Tuple[str, List[str], Optional[Dict]]:
     """
     Enhanced DSS query integrating financial data, user preferences, and optional rules.
@@ -44,17 +301,45 @@ def query_financial_dss(
         ticker: Stock ticker symbol
         preferences: Dict with risk_tolerance, time_horizon, risk_behavior
         use_rules: Whether to retrieve and use rules from ChromaDB
+        stock_context: Returns (stock_summary, financial_context) for this
+            ticker and preferences, e.g. from a memo of prepare_stock_context;
+            only called on a cache miss, after rule retrieval has started
+        on_token: Receives the LLM output chunk by chunk as it is generated
+            (not called for cached answers)
+        rules: (rules_text, sources) already retrieved for this query and
+            ticker, e.g. by retrieve_rules_batch
 
     Returns:
         (response_text, sources, stock_summary)
     """
 
-    # Step 1: Fetch and summarize stock data
-    print(f"Fetching financial data for {ticker}...")
-    financial_provider = FinancialDataProvider()
-    stock_summary = financial_provider.get_stock_summary(ticker)
+    # Serve near-identical earlier questions about the same stock and profile,
+    # before any market data is fetched or loaded
+    cache_bucket = _SemanticCache.bucket_key(ticker, preferences, use_rules)
+    query_embedding = _embed_query(query_text)
+    if query_embedding is not None:
+        cached = _semantic_cache.lookup(cache_bucket, query_embedding)
+        if cached is not None:
+            print("Serving DSS analysis from semantic cache...")
+            return cached
+
+    # Step 4 (rule retrieval) is independent of the market data, so start it on
+    # a worker and let it overlap with Steps 1 & 3
+    rules_future = None
+    if use_rules and rules is None and _chroma_available():
+        print("Retrieving relevant rules from knowledge base...")
+        rules_future = _rules_executor.submit(retrieve_rules, query_text, ticker)
+
+    # Steps 1 & 3: Fetch stock data and format it with preference context,
+    # through the caller's loader when it has one
+    if stock_context is None:
+        stock_summary, financial_context = prepare_stock_context(ticker, preferences)
+    else:
+        stock_summary, financial_context = stock_context()
 
     if not stock_summary:
+        if rules_future is not None:
+            rules_future.cancel()
         return f"Unable to fetch data for ticker {ticker}. Please verify the ticker symbol.", [], None
 
     # Step 2: Initialize preference engine
@@ -64,16 +349,15 @@ def query_financial_dss(
         risk_behavior=preferences.get('risk_behavior', 'Risk-averse')
     )
 
-    # Step 3: Format financial data with preference context
-    financial_context = financial_provider.format_for_llm(stock_summary, preferences)
-
-    # Step 4: Retrieve relevant rules if enabled
+    # Step 4: Collect the retrieved rules
     rules_context = ""
     sources = []
 
-    if use_rules and os.path.exists(CHROMA_PATH):
-        print("Retrieving relevant rules from knowledge base...")
-        rules_text, rule_sources = retrieve_rules(query_text, ticker)
+    if rules_future is not None:
+        rules = rules_future.result()
+
+    if use_rules and rules is not None:
+        rules_text, rule_sources = rules
         if rules_text:
             rules_context = f"\nRELEVANT RULES AND CONSTRAINTS:\n{rules_text}\n"
             sources.extend(rule_sources)
@@ -88,9 +372,30 @@ def query_financial_dss(
 
     # Step 6: Query LLM
     print("Generating DSS analysis...")
-    response_text = query_llm_with_dss_prompt(prompt)
+    response_text = query_llm_with_dss_prompt(prompt, on_token=on_token)
+
+    result = (response_text, list(dict.fromkeys(sources)), stock_summary)
+    if query_embedding is not None and not response_text.startswith(FALLBACK_HEADER):
+        _semantic_cache.insert(cache_bucket, query_embedding, result)
+
+    return result
+
+
+def prepare_stock_context(ticker: str, preferences: Dict[str, str]) -> Tuple[Optional[Dict], str]:
+    """
+    Fetch the stock summary and render its preference-aware narrative.
+
+    Returns:
+        (stock_summary, financial_context); stock_summary is None if the fetch failed
+    """
+    print(f"Fetching financial data for {ticker}...")
+    financial_provider = get_financial_provider()
+    stock_summary = financial_provider.get_stock_summary(ticker)
+
+    if not stock_summary:
+        return None, ""
 
-    return response_text, list(set(sources)), stock_summary
+    return stock_summary, financial_provider.format_for_llm(stock_summary, preferences)
 
 
 def retrieve_rules(query_text: str, ticker: str) -> Tuple[str, List[str]]:
@@ -100,63 +405,72 @@ def retrieve_rules(query_text: str, ticker: str) -> Tuple[str, List[str]]:
     Returns:
         (rules_text, sources)
     """
-    db = None
     try:
-        # Initialize embeddings
-        embedding_function = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2",
-            model_kwargs={'device': 'cpu'}
-        )
-
-        # Load vector database
-        db = Chroma(persist_directory=CHROMA_PATH, embedding_function=embedding_function)
-
-        # Construct search query combining user question and ticker
-        search_query = f"{query_text} {ticker} investment rules constraints"
+        # Shared vector database handle (embedding model loaded once per process)
+        db = _get_chroma_db()
 
         # Retrieve relevant chunks
-        docs = db.similarity_search(search_query, k=5)
+        docs = db.similarity_search(_rules_search_query(query_text, ticker), k=5)
 
-        if not docs:
-            return "", []
+        return _format_rules([doc.page_content for doc in docs], [doc.metadata for doc in docs])
 
-        # Extract and format rules
-        rules_parts = []
-        sources = []
+    except Exception as e:
+        print(f"Error retrieving rules: {e}")
+        return "", []
 
-        for i, doc in enumerate(docs, 1):
-            content = doc.page_content.strip()
-            source = doc.metadata.get("source", "Unknown")
 
-            rules_parts.append(f"[Rule {i}] {content}")
-            sources.append(source)
+def retrieve_rules_batch(queries: List[Tuple[str, str]]) -> List[Tuple[str, List[str]]]:
+    """
+    Retrieve rules for several (query_text, ticker) pairs at once.
+
+    All search strings are embedded in one batch and looked up with a single
+    Chroma query, instead of one embedding pass and index scan per ticker.
 
-        rules_text = "\n\n".join(rules_parts)
-        return rules_text, sources
+    Returns:
+        [(rules_text, sources), ...] in the same order as queries
+    """
+    if not queries:
+        return []
 
+    try:
+        db = _get_chroma_db()
+        search_queries = [_rules_search_query(query_text, ticker) for query_text, ticker in queries]
+        query_embeddings = _get_embeddings().embed_documents(search_queries)
+
+        results = db._collection.query(
+            query_embeddings=query_embeddings,
+            n_results=5,
+            include=["documents", "metadatas"]
+        )
     except Exception as e:
         print(f"Error retrieving rules: {e}")
+        return [("", [])] * len(queries)
+
+    return [
+        _format_rules(contents, metadatas)
+        for contents, metadatas in zip(results["documents"], results["metadatas"])
+    ]
+
+
+def _rules_search_query(query_text: str, ticker: str) -> str:
+    """Construct search query combining user question and ticker"""
+    return f"{query_text} {ticker} investment rules constraints"
+
+
+def _format_rules(contents: List[str], metadatas: List[Optional[Dict]]) -> Tuple[str, List[str]]:
+    """Number the retrieved chunks as rules; sources are deduplicated in ranking order"""
+    if not contents:
         return "", []
-    finally:
-        # Ensure database connection is closed
-        if db is not None:
-            try:
-                del db
-            except:
-                pass
 
+    rules_parts = [f"[Rule {i}] {content.strip()}" for i, content in enumerate(contents, 1)]
+    sources = dict.fromkeys((metadata or {}).get("source", "Unknown") for metadata in metadatas)
 
-def build_dss_prompt(
-        query: str,
-        financial_context: str,
-        rules_context: str,
-        preference_guidance: str
-) -> str:
-    """
-    Build the comprehensive DSS prompt that enforces exploratory analysis behavior.
-    """
+    rules_text = "\n\n".join(rules_parts)
+    return rules_text, list(sources)
 
-    dss_system_prompt = """You are a financial decision support analyst. Your role is to provide structured, objective insights that help users understand investment characteristics and trade-offs—NOT to recommend specific actions.
+
+# System prompt and layout of every DSS prompt; filled with str.format_map
+_DSS_SYSTEM_PROMPT = """You are a financial decision support analyst. Your role is to provide structured, objective insights that help users understand investment characteristics and trade-offs—NOT to recommend specific actions.
 
         CORE PRINCIPLES:
         1. NEVER recommend "buy", "sell", or "hold"
@@ -173,7 +487,7 @@ def build_dss_prompt(
         - Present information in a balanced, informative manner
         """
 
-    prompt = f"""{dss_system_prompt}
+_DSS_PROMPT_TEMPLATE = """{system_prompt}
 
         {preference_guidance}
         
@@ -198,13 +512,34 @@ def build_dss_prompt(
         ANALYSIS:
         """
 
-    return prompt
+
+def build_dss_prompt(
+        query: str,
+        financial_context: str,
+        rules_context: str,
+        preference_guidance: str
+) -> str:
+    """
+    Build the comprehensive DSS prompt that enforces exploratory analysis behavior.
+    """
+    return _DSS_PROMPT_TEMPLATE.format_map({
+        "system_prompt": _DSS_SYSTEM_PROMPT,
+        "preference_guidance": preference_guidance,
+        "financial_context": financial_context,
+        "rules_context": rules_context,
+        "query": query
+    })
 
 
-def query_llm_with_dss_prompt(prompt: str) -> str:
+def query_llm_with_dss_prompt(prompt: str, on_token: Optional[Callable[[str], None]] = None) -> str:
     """
     Send the DSS prompt to the LLM and return the response.
     Tries Ollama first, falls back to HuggingFace, then to structured fallback.
+
+    Args:
+        prompt: Complete DSS prompt
+        on_token: Called with each chunk as Ollama streams it, so callers can
+            show the analysis while it is being generated
     """
 
     # Try Ollama first (best option)
@@ -212,16 +547,19 @@ def query_llm_with_dss_prompt(prompt: str) -> str:
 
     if ollama_running and models:
         try:
-            model_name = "llama3.2" if any("llama3.2" in m['name'] for m in models) else models[0]['name']
+            model_name = _OLLAMA_MODEL
             print(f"Using Ollama model: {model_name}")
 
-            llm = Ollama(
-                model=model_name,
-                temperature=0.4,  # Slightly higher for more nuanced analysis
-                top_p=0.9,
-            )
+            llm = _get_ollama(model_name, 0.4)  # Slightly higher for more nuanced analysis
 
-            response = llm.invoke(prompt)
+            if on_token is None:
+                response = llm.invoke(prompt)
+            else:
+                chunks = []
+                for chunk in llm.stream(prompt):
+                    on_token(chunk)
+                    chunks.append(chunk)
+                response = "".join(chunks)
 
             # Validate response quality
             if len(response.strip()) > 100:
@@ -235,24 +573,15 @@ def query_llm_with_dss_prompt(prompt: str) -> str:
     # Fallback to HuggingFace (local models)
     try:
         print("Using local Hugging Face model...")
-        from transformers import pipeline, AutoTokenizer, AutoModelForCausalLM
-
-        model_name = "microsoft/DialoGPT-medium"
-        tokenizer = AutoTokenizer.from_pretrained(model_name)
-        model = AutoModelForCausalLM.from_pretrained(model_name)
+        generator = _get_hf_pipeline()
 
-        generator = pipeline(
-            "text-generation",
-            model=model,
-            tokenizer=tokenizer,
-            max_length=min(len(prompt.split()) + 200, 1024),
+        result = generator(
+            prompt,
+            max_length=min(len(prompt) // 4 + 200, 1024),  # ~4 characters per token
             num_return_sequences=1,
             temperature=0.7,
-            do_sample=True,
-            pad_token_id=tokenizer.eos_token_id
+            do_sample=True
         )
-
-        result = generator(prompt)
         response = result[0]['generated_text'][len(prompt):].strip()
 
         if len(response) > 50:
@@ -275,29 +604,29 @@ def generate_structured_fallback(prompt: str) -> str:
     """
 
     response_parts = [
-        "DECISION SUPPORT ANALYSIS:",
+        FALLBACK_HEADER,
         "",
         "Based on the provided financial data and your preferences, here are the key considerations:",
         ""
     ]
 
-    # Extract key metrics from prompt (simplified pattern matching)
-    lines = prompt.split('\n')
+    # Extract key metrics from prompt (simplified pattern matching) in one pass,
+    # keeping volatility, returns and sector lines grouped in that order
+    volatility_lines = []
+    return_lines = []
+    sector_lines = []
 
-    # Find volatility
-    for line in lines:
+    for line in prompt.splitlines():
         if "Annualized Volatility:" in line:
-            response_parts.append(f"• {line.strip()}")
-
-    # Find returns
-    for line in lines:
+            volatility_lines.append(f"• {line.strip()}")
         if "Return" in line and "%" in line:
-            response_parts.append(f"• {line.strip()}")
-
-    # Find sector
-    for line in lines:
+            return_lines.append(f"• {line.strip()}")
         if "Sector:" in line:
-            response_parts.append(f"• {line.strip()}")
+            sector_lines.append(f"• {line.strip()}")
+
+    response_parts.extend(volatility_lines)
+    response_parts.extend(return_lines)
+    response_parts.extend(sector_lines)
 
     response_parts.extend([
         "",
@@ -317,42 +646,30 @@ def query_rag(query_text: str) -> Tuple[str, List[str]]:
     """
 
     # Check if database exists
-    if not os.path.exists(CHROMA_PATH):
+    if not _chroma_available():
         return "Database not found. Please run create_database.py first to create the vector database.", []
 
-    db = None
-    try:
-        # Initialize embeddings
-        embedding_function = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2",
-            model_kwargs={'device': 'cpu'}
-        )
-
-        # Load vector database
-        db = Chroma(persist_directory=CHROMA_PATH, embedding_function=embedding_function)
+    # Shared vector database handle (embedding model loaded once per process)
+    db = _get_chroma_db()
 
-        # Test retrieval first
-        docs = db.similarity_search(query_text, k=5)
-        if not docs:
-            return "No relevant documents found for your query.", []
+    # Test retrieval first
+    docs = db.similarity_search(query_text, k=5)
+    if not docs:
+        return "No relevant documents found for your query.", []
 
-        print(f"Found {len(docs)} relevant documents")
+    print(f"Found {len(docs)} relevant documents")
 
-        # Try Ollama first
-        ollama_running, models = check_ollama_running()
+    # Try Ollama first
+    ollama_running, models = check_ollama_running()
 
-        if ollama_running and models:
-            try:
-                model_name = "llama3.2" if any("llama3.2" in m['name'] for m in models) else models[0]['name']
-                print(f"Using Ollama model: {model_name}")
+    if ollama_running and models:
+        try:
+            model_name = _OLLAMA_MODEL
+            print(f"Using Ollama model: {model_name}")
 
-                llm = Ollama(
-                    model=model_name,
-                    temperature=0.3,
-                    top_p=0.9,
-                )
+            llm = _get_ollama(model_name, 0.3)
 
-                template = """Use the following pieces of context to answer the question at the end. 
+            template = """Use the following pieces of context to answer the question at the end. 
                     If you don't know the answer based on the context, just say that you don't know, don't try to make up an answer.
                     Always provide a complete, well-structured answer based on the context.
                     
@@ -363,42 +680,34 @@ def query_rag(query_text: str) -> Tuple[str, List[str]]:
                     
                     Answer: """
 
-                QA_CHAIN_PROMPT = PromptTemplate.from_template(template)
+            QA_CHAIN_PROMPT = PromptTemplate.from_template(template)
 
-                qa_chain = RetrievalQA.from_chain_type(
-                    llm,
-                    retriever=db.as_retriever(search_kwargs={"k": 5}),
-                    return_source_documents=True,
-                    chain_type_kwargs={"prompt": QA_CHAIN_PROMPT}
-                )
-
-                result = qa_chain.invoke({"query": query_text})
-                response_text = result["result"]
-                sources = [doc.metadata.get("source", "Unknown") for doc in result["source_documents"]]
+            qa_chain = RetrievalQA.from_chain_type(
+                llm,
+                retriever=db.as_retriever(search_kwargs={"k": 5}),
+                return_source_documents=True,
+                chain_type_kwargs={"prompt": QA_CHAIN_PROMPT}
+            )
 
-                return response_text, list(set(sources))
+            result = qa_chain.invoke({"query": query_text})
+            response_text = result["result"]
+            sources = [doc.metadata.get("source", "Unknown") for doc in result["source_documents"]]
 
-            except Exception as e:
-                print(f"Ollama failed: {e}")
+            return response_text, list(dict.fromkeys(sources))
 
-        # Fallback behavior (simplified for brevity)
-        context = "\n\n".join([doc.page_content[:300] for doc in docs[:3]])
-        return f"Based on the documents: {context[:500]}...", [doc.metadata.get("source", "Unknown") for doc in docs]
+        except Exception as e:
+            print(f"Ollama failed: {e}")
 
-    finally:
-        # Ensure database connection is closed
-        if db is not None:
-            try:
-                del db
-            except:
-                pass
+    # Fallback behavior (simplified for brevity)
+    context = "\n\n".join([doc.page_content[:300] for doc in docs[:3]])
+    return f"Based on the documents: {context[:500]}...", [doc.metadata.get("source", "Unknown") for doc in docs]
 
 
 def main():
     """CLI interface for testing"""
     parser = argparse.ArgumentParser()
     parser.add_argument("query_text", type=str, help="The query text.")
-    parser.add_argument("--ticker", type=str, default="AAPL", help="Stock ticker symbol")
+    parser.add_argument("--ticker", type=str, nargs="+", default=["AAPL"], help="Stock ticker symbol(s)")
     parser.add_argument("--risk", type=str, default="Medium", choices=["Low", "Medium", "High"])
     parser.add_argument("--horizon", type=str, default="Long-term (>1yr)")
     parser.add_argument("--behavior", type=str, default="Risk-averse", choices=["Risk-averse", "Risk-seeking"])
@@ -412,23 +721,45 @@ def main():
         'risk_behavior': args.behavior
     }
 
-    response, sources, summary = query_financial_dss(
-        args.query_text,
-        args.ticker,
-        preferences,
-        use_rules=not args.no_rules
-    )
+    use_rules = not args.no_rules
+
+    # Several tickers: retrieve all their rules in one batched lookup
+    ticker_rules = [None] * len(args.ticker)
+    if use_rules and len(args.ticker) > 1 and _chroma_available():
+        ticker_rules = retrieve_rules_batch([(args.query_text, ticker) for ticker in args.ticker])
+
+    # Echo the analysis as the model generates it
+    streamed = []
+
+    def echo_token(token: str):
+        streamed.append(token)
+        sys.stdout.write(token)
+        sys.stdout.flush()
+
+    for ticker, rules in zip(args.ticker, ticker_rules):
+        print("\n" + "=" * 80)
+        print(f"DSS ANALYSIS RESPONSE ({ticker}):")
+        print("=" * 80)
+
+        streamed.clear()
+        response, sources, summary = query_financial_dss(
+            args.query_text,
+            ticker,
+            preferences,
+            use_rules=use_rules,
+            on_token=echo_token,
+            rules=rules
+        )
 
-    print("\n" + "=" * 80)
-    print("DSS ANALYSIS RESPONSE:")
-    print("=" * 80)
-    print(response)
-    print("\n" + "=" * 80)
-    print("SOURCES:")
-    print("=" * 80)
-    for source in sources:
-        print(f"  • {source}")
-    print("=" * 80 + "\n")
+        # Cached and fallback answers were not streamed
+        if "".join(streamed).strip() != response:
+            print(response)
+        print("\n" + "=" * 80)
+        print("SOURCES:")
+        print("=" * 80)
+        for source in sources:
+            print(f"  • {source}")
+        print("=" * 80 + "\n")
 
 
 if __name__ == "__main__":